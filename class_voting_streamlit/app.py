@@ -1,13 +1,78 @@
 import streamlit as st
 import json
-import requests
+import hashlib
+import httpx
 import time
+import numpy as np
+import pandas as pd
 import random
+import copy
+import itertools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 import firebase_admin
-from firebase_admin import credentials, db
+from firebase_admin import credentials, db, exceptions
+
+# orjson is much faster at parsing the vote payloads; the stdlib json module
+# reads and writes the same data if it isn't installed
+try:
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    from json import dumps as json_dumps, loads as json_loads
 
 # Firebase configuration
 FIREBASE_URL = "https://ai-ia-6ff81-default-rtdb.firebaseio.com/"
+REQUEST_TIMEOUT = 10  # seconds
+MAX_IDEAS = 200  # newest ideas loaded per class when polling
+SERVER_TIMESTAMP = {".sv": "timestamp"}  # filled in by Firebase when written
+LISTEN_RETRY_DELAY = 60  # seconds to poll a class after its listener failed, before listening again
+LISTEN_IDLE_TIMEOUT = 600  # seconds without reads before a class's listener is closed
+AUTO_SAVE_DEBOUNCE = 0.4  # seconds to wait for the slider to settle before auto-saving
+
+# Labels for the rating slider, with 0 as "No Vote"
+RATING_LABELS = {
+    0: "No Vote",
+    1: "1 - Clearly Unacceptable",
+    2: "2 - Somewhat Unacceptable",
+    3: "3 - Neutral/Borderline",
+    4: "4 - Somewhat Acceptable",
+    5: "5 - Clearly Acceptable"
+}
+
+# Shared HTTP/2 client for the unauthenticated fallback. Calls reuse one pooled
+# connection (HTTP/2 multiplexes concurrent requests over it) instead of a new TLS
+# handshake each time, and responses are gzip-compressed by Firebase. Failed
+# connection attempts are retried; httpx never retries a request that was sent,
+# so this is safe for writes too.
+_CLIENT = httpx.Client(
+    transport=httpx.HTTPTransport(
+        http2=True,
+        limits=httpx.Limits(max_connections=16, max_keepalive_connections=4),
+        retries=2
+    ),
+    timeout=REQUEST_TIMEOUT,
+    headers={"Accept-Encoding": "gzip"}
+)
+
+# Background writer, so Firebase round trips don't block the rerun that made them.
+# Writes for the same voter, including clearing all of their votes, are applied in
+# the order they were queued, and a write that a newer one to the same path (or a
+# parent path) has superseded is skipped. Debounced writes wait on a timer and
+# only take a worker once it fires; a newer write to the same path cancels them.
+_WRITE_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="firebase-write")
+_READ_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="firebase-read")
+_WRITE_SEQUENCE = itertools.count()
+_LATEST_WRITES = {}  # path -> sequence number of the newest queued write
+_PENDING_TIMERS = {}  # sequence number -> (timer, future, child paths) of debounced writes
+_LATEST_WRITES_LOCK = threading.Lock()
+_VOTER_LOCKS = [threading.Lock() for _ in range(16)]
+
+_MIGRATED_CLASSES = set()  # classes whose legacy array votes have been saved as objects
+_LIVE_CLASSES = {}  # class code -> _LiveClass kept current by a listener
+_LIVE_CLASSES_LOCK = threading.Lock()
+_LISTEN_START_LOCKS = {}  # class code -> lock held while its listener starts
+_LISTEN_RETRY_AT = {}  # class code -> monotonic time after which to try listening again
+_IDEAS_INDEX_MISSING = False  # set once Firebase rejects the ordered ideas query
 
 # Initialize Firebase with credentials if not already initialized
 if not firebase_admin._apps:
@@ -30,94 +95,529 @@ if "app_mode" not in st.session_state:
     st.session_state.app_mode = "idea_submission"
 if "class_code" not in st.session_state:
     st.session_state.class_code = ""
+if "class_name" not in st.session_state:
+    st.session_state.class_name = ""
 if "authenticated" not in st.session_state:
     st.session_state.authenticated = False
 
+def idea_details(idea_data):
+    """Return (idea_text, submitted_by) for an idea, with fallbacks for malformed data"""
+    if isinstance(idea_data, dict):
+        return idea_data.get('idea', 'Unknown scenario'), idea_data.get('submitted_by', 'Unknown')
+    return 'Unknown scenario', 'Unknown'
+
+def parsed_ideas(ideas):
+    """Return {idea_id: (idea_text, submitted_by)} for the given ideas
+    
+    Ideas aren't edited once submitted, so the parsed details are kept in session
+    state and reused for as long as the class and its idea ids stay the same.
+    Legacy ids like `idea_0` repeat across classes, hence the class code.
+    """
+    ideas_key = (st.session_state.class_code, tuple(ideas))
+    cached_key, details = st.session_state.get("parsed_ideas", (None, None))
+    if cached_key != ideas_key:
+        details = {idea_id: idea_details(idea_data) for idea_id, idea_data in ideas.items()}
+        st.session_state.parsed_ideas = (ideas_key, details)
+    return details
+
 # Firebase helper functions
+# The path helpers use the Admin SDK when it's initialized and fall back to the
+# REST API otherwise. Writes return whether they succeeded; Admin SDK errors are
+# raised for the caller to handle.
+def _rest_url(path):
+    """REST endpoint for a database path"""
+    return f"{FIREBASE_URL}{path.lstrip('/')}.json"
+
+def _read_path(path):
+    """Read the value at a database path, or None if it can't be read"""
+    if firebase_admin._apps:
+        return db.reference(path).get()
+    response = _CLIENT.get(_rest_url(path))
+    if response.status_code == 200:
+        return json_loads(response.content)
+    return None
+
+def _write_path(path, value):
+    """Set value at a database path, or delete the path when value is None"""
+    if value is None:
+        return _delete_path(path)
+    if firebase_admin._apps:
+        db.reference(path).set(value)
+        return True
+    return _CLIENT.put(_rest_url(path), content=json_dumps(value)).status_code == 200
+
+def _delete_path(path):
+    """Delete a database path"""
+    if firebase_admin._apps:
+        db.reference(path).delete()
+        return True
+    return _CLIENT.delete(_rest_url(path)).status_code == 200
+
+def _update_path(path, updates):
+    """Apply a multi-path update of children below path, deleting those set to None"""
+    if firebase_admin._apps:
+        db.reference(path).update(updates)
+        return True
+    return _CLIENT.patch(_rest_url(path), content=json_dumps(updates)).status_code == 200
+
+def _push_path(path, value):
+    """Add value as a new child of path under a unique, chronological key"""
+    if firebase_admin._apps:
+        db.reference(path).push(value)
+        return True
+    # POST is the REST equivalent of push
+    return _CLIENT.post(_rest_url(path), content=json_dumps(value)).status_code == 200
+
+def _ordered_ideas(ideas):
+    """Return ideas as an ordered dict keyed by the idea id used for votes
+    
+    Ideas were originally stored as a list, so legacy ideas keep their
+    `idea_{index}` ids. New ideas are pushed under Firebase keys, which sort
+    chronologically after the numeric legacy keys.
+    """
+    if isinstance(ideas, list):
+        items = [(str(i), idea) for i, idea in enumerate(ideas)]
+    elif isinstance(ideas, dict):
+        items = sorted(
+            ideas.items(),
+            key=lambda item: (0, int(item[0]), "") if item[0].isdigit() else (1, 0, item[0])
+        )
+    else:
+        items = []
+    return {f"idea_{key}": idea for key, idea in items if idea is not None}
+
+def _fetch_ideas(class_code):
+    """Fetch the newest MAX_IDEAS ideas for a class, ordered by timestamp
+    
+    The query needs `".indexOn": "timestamp"` on the ideas in the database
+    rules. Without it Firebase rejects the query and all ideas are read instead;
+    the rejection is remembered, so later calls read them straight away.
+    Legacy ideas have timestamps in seconds rather than milliseconds, so they
+    still sort before newer ones.
+    """
+    global _IDEAS_INDEX_MISSING
+    if firebase_admin._apps:
+        ideas_ref = db.reference(f"/classes/{class_code}/ideas")
+        if not _IDEAS_INDEX_MISSING:
+            try:
+                return ideas_ref.order_by_child("timestamp").limit_to_last(MAX_IDEAS).get()
+            except exceptions.InvalidArgumentError:
+                _IDEAS_INDEX_MISSING = True
+        return ideas_ref.get()
+    
+    ideas_url = _rest_url(f"/classes/{class_code}/ideas")
+    response = None
+    if not _IDEAS_INDEX_MISSING:
+        response = _CLIENT.get(ideas_url, params={"orderBy": '"timestamp"', "limitToLast": MAX_IDEAS})
+        if response.status_code == 400:
+            _IDEAS_INDEX_MISSING = True
+            response = None
+    if response is None:
+        response = _CLIENT.get(ideas_url)
+    if response.status_code == 200:
+        return json_loads(response.content)
+    return None
+
+def _fetch_votes(class_code):
+    """Fetch all votes for a class"""
+    return _read_path(f"/classes/{class_code}/votes")
+
+@st.cache_data(ttl=5, show_spinner=False)
+def _fetch_class(class_code):
+    """Fetch raw class data from Firebase, cached briefly so reruns share one read"""
+    # Votes are read alongside the bounded ideas query, so this costs one round trip
+    votes = _READ_EXECUTOR.submit(_fetch_votes, class_code)
+    ideas = _fetch_ideas(class_code)
+    return {"ideas": ideas, "votes": votes.result()}
+
+def _put_at(tree, keys, value):
+    """Return tree with value stored under the nested keys, or removed if None"""
+    if not keys:
+        return value
+    if isinstance(tree, list):
+        # Firebase arrays are objects with integer keys once written into
+        tree = {str(i): item for i, item in enumerate(tree) if item is not None}
+    elif not isinstance(tree, dict):
+        tree = {}
+    
+    child = _put_at(tree.get(keys[0]), keys[1:], value)
+    if child is None:
+        tree.pop(keys[0], None)
+    else:
+        tree[keys[0]] = child
+    return tree
+
+class _LiveClass:
+    """In-memory copy of a class, kept current by a Firebase streaming listener"""
+    
+    def __init__(self, class_code):
+        self._lock = threading.Lock()
+        self._data = None
+        self._failed = False
+        self._registration = None
+        self._error = None
+        self.ready = threading.Event()  # set once the initial snapshot arrives
+        self.last_read = time.monotonic()
+        
+        # Threads inherit daemon status from the thread that starts them, so the
+        # listener is started from a daemon thread to keep it from blocking shutdown
+        starter = threading.Thread(target=self._listen, args=(class_code,), daemon=True)
+        starter.start()
+        starter.join()
+        if self._error:
+            raise self._error
+    
+    def _listen(self, class_code):
+        try:
+            self._registration = db.reference(f"/classes/{class_code}").listen(self._on_event)
+        except Exception as e:
+            self._error = e
+    
+    def _on_event(self, event):
+        try:
+            keys = [key for key in event.path.split("/") if key]
+            with self._lock:
+                if event.event_type == "patch":
+                    # Patch data maps child paths (relative to event.path) to new values
+                    for child_path, value in (event.data or {}).items():
+                        self._data = _put_at(self._data, keys + child_path.split("/"), value)
+                else:
+                    self._data = _put_at(self._data, keys, event.data)
+        except Exception as e:
+            # The copy may now be out of step, so stop serving it
+            print(f"Warning: Could not apply a change from the class listener: {e}")
+            self._failed = True
+            return
+        self.ready.set()
+    
+    def alive(self):
+        """Whether the copy is current: it has loaded and the listener still runs
+        
+        The listener's thread exits if reconnecting to Firebase fails, after
+        which the copy would silently stop changing.
+        """
+        thread = getattr(self._registration, "_thread", None)
+        return self.ready.is_set() and not self._failed and (thread is None or thread.is_alive())
+    
+    def close(self):
+        """Stop the listener in the background
+        
+        Closing joins the listener's thread, which can stay blocked reading the
+        stream until Firebase next sends something, so callers don't wait on it.
+        """
+        threading.Thread(target=self._close, daemon=True).start()
+    
+    def _close(self):
+        try:
+            self._registration.close()
+        except Exception as e:
+            print(f"Warning: Could not close a class listener: {e}")
+    
+    def snapshot(self):
+        """Return a copy of the class data that callers are free to modify"""
+        with self._lock:
+            return copy.deepcopy(self._data)
+
+def _start_live_class(class_code):
+    """Start listening to a class and wait for its initial snapshot, or None if it can't start"""
+    try:
+        live = _LiveClass(class_code)
+    except Exception as e:
+        print(f"Warning: Could not listen for changes to class {class_code}, polling instead: {e}")
+        return None
+    live.ready.wait(timeout=REQUEST_TIMEOUT)
+    return live
+
+def _current_live_class(class_code):
+    """The class's listener if its copy is current, or None to poll instead
+    
+    One listener per class is shared by the whole server, and only the call
+    that starts it waits for the initial snapshot. A listener that couldn't
+    start, stopped, or never loaded is closed, and the class is then polled for
+    LISTEN_RETRY_DELAY seconds before another one is started, so a failing
+    listener doesn't stall reruns. Listeners for classes nobody has read for
+    LISTEN_IDLE_TIMEOUT seconds are closed.
+    """
+    if not firebase_admin._apps:
+        # The unauthenticated fallback has no listener, so it keeps polling
+        return None
+    
+    now = time.monotonic()
+    with _LIVE_CLASSES_LOCK:
+        for idle_code, idle in list(_LIVE_CLASSES.items()):
+            if now - idle.last_read > LISTEN_IDLE_TIMEOUT:
+                del _LIVE_CLASSES[idle_code]
+                idle.close()
+        live = _LIVE_CLASSES.get(class_code)
+        start_lock = _LISTEN_START_LOCKS.setdefault(class_code, threading.Lock())
+    
+    if live is None:
+        # Other sessions reading the class wait here while its listener starts
+        with start_lock:
+            with _LIVE_CLASSES_LOCK:
+                live = _LIVE_CLASSES.get(class_code)
+            if live is None:
+                if now < _LISTEN_RETRY_AT.get(class_code, 0):
+                    return None
+                live = _start_live_class(class_code)
+                if live is not None:
+                    with _LIVE_CLASSES_LOCK:
+                        _LIVE_CLASSES[class_code] = live
+    
+    if live is None or not live.alive():
+        with _LIVE_CLASSES_LOCK:
+            # Only the session that drops the listener closes it
+            dropped = live is not None and _LIVE_CLASSES.get(class_code) is live
+            if dropped:
+                del _LIVE_CLASSES[class_code]
+        if dropped:
+            live.close()
+        _LISTEN_RETRY_AT[class_code] = time.monotonic() + LISTEN_RETRY_DELAY
+        return None
+    live.last_read = time.monotonic()
+    return live
+
+def _convert_legacy_votes(votes):
+    """Convert array-based voters to object format in place, returning the converted ones"""
+    legacy = {voter: voter_votes for voter, voter_votes in votes.items() if isinstance(voter_votes, list)}
+    if not legacy:
+        return {}
+    
+    # Convert arrays to object format with prefixed keys, formatting each key
+    # once and sharing it across voters
+    idea_ids = tuple(f"idea_{i}" for i in range(max(map(len, legacy.values()))))
+    converted = {
+        voter: {idea_ids[i]: vote for i, vote in enumerate(voter_votes) if vote is not None}
+        for voter, voter_votes in legacy.items()
+    }
+    votes.update(converted)
+    return converted
+
+def migrate_legacy_votes(class_code):
+    """Save array-based votes back to Firebase in object format, once per class
+    
+    get_data converts them in memory on every read, so this only needs to run
+    when a class is first joined.
+    """
+    if class_code in _MIGRATED_CLASSES:
+        return
+    
+    try:
+        converted = _convert_legacy_votes(_fetch_votes(class_code) or {})
+        if converted:
+            # Save all converted voters back to Firebase in one multi-path update
+            updates = {f"votes/{voter}": object_votes for voter, object_votes in converted.items()}
+            if not _update_path(f"/classes/{class_code}", updates):
+                return
+            _fetch_class.clear(class_code)
+        _MIGRATED_CLASSES.add(class_code)
+    except Exception as e:
+        st.error(f"Error updating old votes: {str(e)}")
+
 def get_data(class_code=None):
     """Fetch data from Firebase for a specific class"""
     if not class_code:
         class_code = st.session_state.class_code
     
     try:
-        # Try to use Firebase Admin SDK if initialized
-        if firebase_admin._apps:
-            ref = db.reference(f"/classes/{class_code}")
-            data = ref.get()
+        live = _current_live_class(class_code)
+        if live is not None:
+            # Served from the listener's copy, without a request to Firebase
+            data = live.snapshot()
         else:
-            # Fallback to unauthenticated access
-            response = requests.get(f"{FIREBASE_URL}/classes/{class_code}.json")
-            if response.status_code == 200:
-                data = response.json()
-            else:
-                return {"ideas": [], "votes": {}}
+            data = _fetch_class(class_code)
         
         if data:
-            # Convert any array-based votes to object format
-            if "votes" in data:
-                for voter, votes in data["votes"].items():
-                    if isinstance(votes, list):
-                        # Convert array to object format with prefixed keys
-                        object_votes = {}
-                        for i, vote in enumerate(votes):
-                            object_votes[f"idea_{i}"] = vote
-                        data["votes"][voter] = object_votes
-                        
-                        # Save the converted format back to Firebase
-                        if firebase_admin._apps:
-                            votes_ref = db.reference(f"/classes/{class_code}/votes/{voter}")
-                            votes_ref.set(object_votes)
-                        else:
-                            requests.put(
-                                f"{FIREBASE_URL}/classes/{class_code}/votes/{voter}.json",
-                                data=json.dumps(object_votes)
-                            )
+            data["ideas"] = _ordered_ideas(data.get("ideas"))
+            
+            data["votes"] = data.get("votes") or {}
+            _convert_legacy_votes(data["votes"])
             return data
         else:
-            return {"ideas": [], "votes": {}}
+            return {"ideas": {}, "votes": {}}
     except Exception as e:
         st.error(f"Error retrieving data: {str(e)}")
-        return {"ideas": [], "votes": {}}
+        return {"ideas": {}, "votes": {}}
 
 def save_data(data, class_code=None):
-    """Save data to Firebase for a specific class"""
+    """Save data to Firebase for a specific class
+    
+    This overwrites the whole class; prefer append_idea and reset_data,
+    which only send what changed.
+    """
     if not class_code:
         class_code = st.session_state.class_code
     
     try:
-        if firebase_admin._apps:
-            # Use authenticated Firebase Admin SDK
-            ref = db.reference(f"/classes/{class_code}")
-            ref.set(data)
-            return True
-        else:
-            # Fallback to unauthenticated access
-            response = requests.put(
-                f"{FIREBASE_URL}/classes/{class_code}.json", 
-                data=json.dumps(data)
-            )
-            return response.status_code == 200
+        success = _write_path(f"/classes/{class_code}", data)
+        _fetch_class.clear(class_code)
+        return success
     except Exception as e:
         st.error(f"Error saving data: {str(e)}")
         return False
 
-def get_class_codes():
-    """Get list of existing class codes"""
+def append_idea(idea, class_code=None):
+    """Append one idea to a class under a new Firebase push key"""
+    if not class_code:
+        class_code = st.session_state.class_code
+    
+    try:
+        # Push generates a unique key server-side, so concurrent submissions can't collide
+        if not _push_path(f"/classes/{class_code}/ideas", idea):
+            return False
+        _fetch_class.clear(class_code)
+        return True
+    except Exception as e:
+        st.error(f"Error saving scenario: {str(e)}")
+        return False
+
+def reset_data(class_code=None):
+    """Remove all ideas and votes for a class without reading it first"""
+    if not class_code:
+        class_code = st.session_state.class_code
+    
+    cleared = {"ideas": None, "votes": None}
     try:
-        if firebase_admin._apps:
-            # Use authenticated Firebase Admin SDK
-            ref = db.reference("/class_access_codes")
-            data = ref.get()
-            return data or {}
+        success = _update_path(f"/classes/{class_code}", cleared)
+        _fetch_class.clear(class_code)
+        return success
+    except Exception as e:
+        st.error(f"Error resetting data: {str(e)}")
+        return False
+
+def _voter_path(path):
+    """The /classes/{code}/votes/{voter} path that a vote path belongs to"""
+    return "/".join(path.split("/")[:5])
+
+def _apply_update(path, updates, sequence, class_code):
+    """Apply a multi-path update below path, leaving out superseded children
+    
+    `updates` maps child keys to new values, with None deleting the child. Runs
+    on a worker thread, so it reports failure through its return value instead
+    of calling into Streamlit.
+    """
+    child_paths = {key: f"{path}/{key}" for key in updates}
+    voter_path = _voter_path(next(iter(child_paths.values())))
+    with _VOTER_LOCKS[hash(voter_path) % len(_VOTER_LOCKS)]:
+        try:
+            with _LATEST_WRITES_LOCK:
+                # Children with a newer write queued will get that one instead
+                updates = {
+                    key: value for key, value in updates.items()
+                    if _LATEST_WRITES.get(child_paths[key]) == sequence
+                }
+            if not updates:
+                return True
+            
+            if len(updates) == 1:
+                # A single child is set or deleted directly at its own path
+                (key, value), = updates.items()
+                success = _write_path(child_paths[key], value)
+            else:
+                success = _update_path(path, updates)
+        finally:
+            with _LATEST_WRITES_LOCK:
+                for child_path in child_paths.values():
+                    if _LATEST_WRITES.get(child_path) == sequence:
+                        del _LATEST_WRITES[child_path]
+            if updates:
+                # Even a failed write may have partly landed, so don't serve the
+                # cached read either way
+                _fetch_class.clear(class_code)
+    return success
+
+def _start_debounced(sequence, future, args):
+    """Timer callback that hands a debounced write to the writer pool"""
+    with _LATEST_WRITES_LOCK:
+        if _PENDING_TIMERS.pop(sequence, None) is None:
+            # A newer write cancelled this one as the timer fired
+            return
+    
+    def settle(write):
+        if write.exception():
+            future.set_exception(write.exception())
         else:
-            # Fallback to unauthenticated access
-            response = requests.get(f"{FIREBASE_URL}/class_access_codes.json")
-            if response.status_code == 200 and response.json():
-                return response.json()
-            return {}
+            future.set_result(write.result())
+    
+    _WRITE_EXECUTOR.submit(_apply_update, *args).add_done_callback(settle)
+
+def queue_update(path, updates, class_code=None, delay=0):
+    """Update children of path (deleting those set to None) on a background thread
+    
+    Returns immediately. The future is kept in session state so later reruns
+    can show that a sync is pending and report failures. Pass a delay in
+    seconds to debounce rapid writes to the same children into one.
+    """
+    if not class_code:
+        class_code = st.session_state.class_code
+    
+    with _LATEST_WRITES_LOCK:
+        sequence = next(_WRITE_SEQUENCE)
+        for key in updates:
+            child_path = f"{path}/{key}"
+            _LATEST_WRITES[child_path] = sequence
+            # Queued writes below this child would land on top of it, so drop them
+            for pending_path in [p for p in _LATEST_WRITES if p.startswith(f"{child_path}/")]:
+                del _LATEST_WRITES[pending_path]
+        
+        # Cancel debounced writes that are now superseded for all their children
+        for pending_sequence, (timer, pending_future, child_paths) in list(_PENDING_TIMERS.items()):
+            if all(_LATEST_WRITES.get(p) != pending_sequence for p in child_paths):
+                del _PENDING_TIMERS[pending_sequence]
+                timer.cancel()
+                pending_future.set_result(True)
+        
+        args = (path, dict(updates), sequence, class_code)
+        if delay:
+            future = Future()
+            timer = threading.Timer(delay, _start_debounced, (sequence, future, args))
+            timer.daemon = True
+            _PENDING_TIMERS[sequence] = (timer, future, [f"{path}/{key}" for key in updates])
+    
+    if delay:
+        timer.start()
+    else:
+        future = _WRITE_EXECUTOR.submit(_apply_update, *args)
+    st.session_state.setdefault("pending_writes", []).append(future)
+    return future
+
+def queue_write(path, value, class_code=None, delay=0):
+    """Write value at path (delete when None) on a background thread"""
+    parent, key = path.rsplit("/", 1)
+    return queue_update(parent, {key: value}, class_code, delay)
+
+def check_pending_writes():
+    """Forget finished background writes and return how many are still in flight
+    
+    If any of them failed, the locally saved votes are dropped so they reload
+    from Firebase on this rerun.
+    """
+    pending = st.session_state.get("pending_writes", [])
+    failed = [f for f in pending if f.done() and (f.exception() or not f.result())]
+    st.session_state.pending_writes = [f for f in pending if not f.done()]
+    
+    if failed:
+        st.error("Some of your votes could not be saved. Please check them and try again.")
+        st.session_state.pop("current_votes", None)
+    return len(st.session_state.pending_writes)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_class_name(class_code):
+    """Fetch a single class's name, cached since class codes rarely change"""
+    return _read_path(f"/class_access_codes/{class_code}")
+
+def get_class_name(class_code):
+    """Get the name of a class, or None if the class code doesn't exist"""
+    # Empty codes, or ones with characters Firebase doesn't allow in keys, can't
+    # exist and would otherwise read some other path
+    if not class_code or any(char in class_code for char in ".$#[]/"):
+        return None
+    
+    try:
+        return _fetch_class_name(class_code)
     except Exception as e:
         st.error(f"Error getting class codes: {str(e)}")
-        return {}
+        return None
 
 def get_teacher_password():
     """Get teacher password from Streamlit secrets or use fallback"""
@@ -127,6 +627,78 @@ def get_teacher_password():
         # Fallback for local development
         return "teacherpass"
 
+def build_results(ideas, votes):
+    """Aggregate votes into the results table, sorted by average score
+    
+    Returns (results_df, chart_data), or None if no scenario has a valid vote.
+    """
+    # Flatten the votes into one row per voter and scenario
+    records = [
+        (voter, idea_id, score)
+        for voter, voter_votes in votes.items()
+        if isinstance(voter_votes, dict)
+        for idea_id, score in voter_votes.items()
+    ]
+    votes_df = pd.DataFrame.from_records(records, columns=["voter", "idea_id", "score"])
+    
+    # Skip invalid votes. Ratings run from 1 to 5, so they fit in int8
+    votes_df["score"] = pd.to_numeric(votes_df["score"], errors="coerce")
+    votes_df = votes_df[votes_df["score"].between(1, 5)].astype({"score": "int8"})
+    
+    # Calculate average scores for each scenario
+    scores = votes_df.groupby("idea_id", sort=False)["score"].agg(avg_score="mean", num_votes="count")
+    
+    # Build the ideas frame column by column from the parsed idea details
+    idea_texts, submitters = zip(*ideas.values())
+    ideas_df = pd.DataFrame({
+        "idea_id": list(ideas),
+        "idea_num": np.arange(1, len(ideas) + 1, dtype=np.int32),
+        "idea": idea_texts,
+        "submitted_by": submitters
+    })
+    
+    # Scenarios without votes get a score and count of 0. Text columns are
+    # Arrow-backed, which is what st.dataframe serializes to anyway
+    results_df = ideas_df.join(scores, on="idea_id").fillna({"avg_score": 0, "num_votes": 0})
+    results_df = results_df.astype({
+        "avg_score": "float32",
+        "num_votes": "int32",
+        "idea": "string[pyarrow]",
+        "submitted_by": "string[pyarrow]"
+    })
+    
+    # Every saved vote may be invalid or for a removed scenario
+    if not results_df["num_votes"].to_numpy().sum():
+        return None
+    
+    # Sort by average score, highest first. A stable sort keeps tied
+    # scenarios in submission order
+    order = np.argsort(-results_df["avg_score"].to_numpy(), kind="stable")
+    results_df = results_df.iloc[order].reset_index(drop=True)
+    
+    # The chart only needs the labels and scores
+    chart_data = pd.DataFrame({
+        "idea_label": "Scenario " + results_df["idea_num"].astype(str),
+        "avg_score": results_df["avg_score"]
+    })
+    return results_df, chart_data
+
+def cached_results(ideas, votes):
+    """Return build_results(ideas, votes), reusing the session's copy if nothing changed
+    
+    The results are keyed on a short hash of the serialized class, so reruns and
+    tab switches with unchanged ideas and votes skip the aggregation.
+    """
+    payload = json_dumps([st.session_state.class_code, ideas, votes])
+    if isinstance(payload, str):  # stdlib json fallback
+        payload = payload.encode()
+    results_key = hashlib.blake2b(payload, digest_size=16).digest()
+    cached_key, results = st.session_state.get("cached_results", (None, None))
+    if cached_key != results_key:
+        results = build_results(ideas, votes)
+        st.session_state.cached_results = (results_key, results)
+    return results
+
 def main():
     # App header
     st.title("AI Ethics Collaborative Voting")
@@ -139,6 +711,8 @@ def main():
         st.session_state.app_mode = "idea_submission"
     if "class_code" not in st.session_state:
         st.session_state.class_code = ""
+    if "class_name" not in st.session_state:
+        st.session_state.class_name = ""
     if "authenticated" not in st.session_state:
         st.session_state.authenticated = False
     
@@ -153,12 +727,14 @@ def main():
             class_code = st.text_input("Enter Class Code:")
             
             if st.button("Join Class"):
-                # Check if class code exists
-                class_codes = get_class_codes()
-                if class_code in class_codes:
+                # Check if class code exists by reading just that code's entry
+                class_name = get_class_name(class_code)
+                if class_name is not None:
+                    migrate_legacy_votes(class_code)
                     st.session_state.class_code = class_code
+                    st.session_state.class_name = class_name
                     st.session_state.authenticated = True
-                    st.success(f"Joined class: {class_codes[class_code]}")
+                    st.success(f"Joined class: {class_name}")
                     time.sleep(1)
                     st.rerun()
                 else:
@@ -176,30 +752,26 @@ def main():
                 elif not new_class_name or not new_class_code:
                     st.error("Please provide both class name and code")
                 else:
-                    # Save new class code
-                    class_codes = get_class_codes()
-                    class_codes[new_class_code] = new_class_name
-                    
+                    # Save just the new class code, so classes created in the
+                    # meantime aren't overwritten, and initialize empty data for
+                    # the new class in the same multi-path update
+                    updates = {
+                        f"class_access_codes/{new_class_code}": new_class_name,
+                        f"classes/{new_class_code}/ideas": None,
+                        f"classes/{new_class_code}/votes": None,
+                    }
                     success = False
-                    if firebase_admin._apps:
-                        try:
-                            ref = db.reference("/class_access_codes")
-                            ref.set(class_codes)
-                            success = True
-                        except Exception as e:
-                            st.error(f"Error creating class: {str(e)}")
-                    else:
-                        response = requests.put(
-                            f"{FIREBASE_URL}/class_access_codes.json",
-                            data=json.dumps(class_codes)
-                        )
-                        success = response.status_code == 200
+                    try:
+                        success = _update_path("/", updates)
+                    except Exception as e:
+                        st.error(f"Error creating class: {str(e)}")
                     
                     if success:
-                        # Initialize empty data for the new class
-                        save_data({"ideas": [], "votes": {}}, new_class_code)
+                        _fetch_class_name.clear(new_class_code)
+                        _fetch_class.clear(new_class_code)
                         
                         st.session_state.class_code = new_class_code
+                        st.session_state.class_name = new_class_name
                         st.session_state.authenticated = True
                         st.success(f"Created and joined class: {new_class_name}")
                         time.sleep(1)
@@ -210,13 +782,14 @@ def main():
         # Stop execution here if not authenticated
         st.stop()
     
-    # Display current class info
-    class_codes = get_class_codes()
-    if st.session_state.class_code in class_codes:
-        st.info(f"Current Class: {class_codes[st.session_state.class_code]} (Code: {st.session_state.class_code})")
+    # Display current class info, using the name stored when the class was joined
+    if st.session_state.class_name:
+        st.info(f"Current Class: {st.session_state.class_name} (Code: {st.session_state.class_code})")
     
-    # Load current data for the authenticated class
+    # Load current data for the authenticated class once per rerun; all tabs
+    # render from this copy
     data = get_data()
+    ideas = parsed_ideas(data["ideas"])
     
     # Admin controls in sidebar
     with st.sidebar:
@@ -226,13 +799,14 @@ def main():
         if st.button("Switch Class"):
             st.session_state.authenticated = False
             st.session_state.class_code = ""
+            st.session_state.class_name = ""
             st.rerun()
         
         # Reset button (only shown to teacher)
         teacher_password = st.text_input("Teacher Password (for reset)", type="password")
         if st.button("Reset All Data"):
             if teacher_password == get_teacher_password():  # Password from secrets
-                if save_data({"ideas": [], "votes": {}}, st.session_state.class_code):
+                if reset_data(st.session_state.class_code):
                     st.success("Data reset successfully!")
                     time.sleep(1)
                     st.rerun()
@@ -274,25 +848,19 @@ def main():
         new_idea = st.text_area("Enter your scenario:", height=100)
         
         if st.button("Submit Scenario"):
-            # Refresh data before modifying to reduce conflicts
-            data = get_data()
-            
             if not student_name:
                 st.error("Please enter your group name first!")
             elif not new_idea:
                 st.error("Please enter a scenario!")
             else:
                 # Add new idea with student name
-                if "ideas" not in data:
-                    data["ideas"] = []
-                
-                data["ideas"].append({
+                new_idea_data = {
                     "idea": new_idea,
                     "submitted_by": student_name,
-                    "timestamp": time.time()  # Add timestamp to help with conflict resolution
-                })
+                    "timestamp": SERVER_TIMESTAMP  # Lets ideas be queried newest-first
+                }
                 
-                if save_data(data, st.session_state.class_code):
+                if append_idea(new_idea_data, st.session_state.class_code):
                     st.success("Scenario submitted successfully!")
                     time.sleep(1)
                     st.rerun()
@@ -304,15 +872,8 @@ def main():
             st.subheader("Current Scenarios")
             
             # Display all ideas without categorization
-            for i, idea_data in enumerate(data["ideas"]):
-                # Check if idea_data has the required fields
-                if isinstance(idea_data, dict) and 'idea' in idea_data and 'submitted_by' in idea_data:
-                    st.markdown(f"**Scenario {i+1}:** {idea_data['idea']} _(by {idea_data['submitted_by']})_")
-                else:
-                    # Handle case where idea data is malformed
-                    idea_text = idea_data.get('idea', 'Unknown scenario') if isinstance(idea_data, dict) else 'Unknown scenario'
-                    submitted_by = idea_data.get('submitted_by', 'Unknown') if isinstance(idea_data, dict) else 'Unknown'
-                    st.markdown(f"**Scenario {i+1}:** {idea_text} _(by {submitted_by})_")
+            for i, (idea_text, submitted_by) in enumerate(ideas.values()):
+                st.markdown(f"**Scenario {i+1}:** {idea_text} _(by {submitted_by})_")
     
     with voting_tab:
         st.header("Vote on AI Ethics Scenarios")
@@ -326,15 +887,17 @@ def main():
         Your votes help us understand our collective ethical judgments.
         """)
         
-        # Refresh data for latest ideas
-        data = get_data()
-        
         if not student_name:
             st.error("Please enter your name to vote!")
         else:
             if data.get("ideas"):
                 st.write("Rate each scenario from 1 to 5 (where 5 is the highest).")
                 
+                # Report on votes still being written in the background
+                pending_count = check_pending_writes()
+                if pending_count:
+                    st.caption(f"⏳ Syncing {pending_count} vote change(s)...")
+                
                 # Auto-save toggle
                 if "auto_save" not in st.session_state:
                     st.session_state.auto_save = False
@@ -351,252 +914,111 @@ def main():
                 if "current_votes" not in st.session_state:
                     st.session_state.current_votes = {}
                     
-                    # Pre-populate with any existing votes from this user
-                    if "votes" in data and student_name in data["votes"]:
-                        # Handle both array and object formats for backward compatibility
-                        if isinstance(data["votes"][student_name], dict):
-                            st.session_state.current_votes = data["votes"][student_name].copy()
-                        elif isinstance(data["votes"][student_name], list):
-                            # Convert array format to object format with prefixed keys
-                            for i, vote in enumerate(data["votes"][student_name]):
-                                if i < len(data["ideas"]):
-                                    st.session_state.current_votes[f"idea_{i}"] = vote
+                    # Pre-populate with any existing votes from this user. get_data
+                    # has already converted legacy array votes to objects
+                    if isinstance(data["votes"].get(student_name), dict):
+                        st.session_state.current_votes = data["votes"][student_name].copy()
                 
-                # Create a randomized list of ideas with their original indices
-                ideas_with_indices = [(i, idea) for i, idea in enumerate(data["ideas"])]
+                # Use session state to maintain the same random order between reruns.
+                # The order is keyed on the current idea ids: when they change, new
+                # ideas are slotted in at random positions and removed ones dropped,
+                # without reshuffling the ideas the student has already seen.
+                ideas_key = tuple(data["ideas"])
+                order_key, idea_order = st.session_state.get("randomized_ideas", (None, []))
+                if order_key != ideas_key:
+                    idea_order = [idea_id for idea_id in idea_order if idea_id in data["ideas"]]
+                    seen = set(idea_order)
+                    for idea_id in ideas_key:
+                        if idea_id not in seen:
+                            idea_order.insert(random.randint(0, len(idea_order)), idea_id)
+                    st.session_state.randomized_ideas = (ideas_key, idea_order)
                 
-                # Use session state to maintain the same random order between reruns
-                if "randomized_ideas" not in st.session_state:
-                    random.shuffle(ideas_with_indices)
-                    st.session_state.randomized_ideas = ideas_with_indices
-                else:
-                    ideas_with_indices = st.session_state.randomized_ideas
+                votes_path = f"/classes/{st.session_state.class_code}/votes/{student_name}"
                 
-                # Function to save vote
-                def save_vote(idea_id, rating):
-                    # Refresh data to minimize conflicts
-                    updated_data = get_data()
-                    
-                    # Initialize votes dict if needed
-                    if "votes" not in updated_data:
-                        updated_data["votes"] = {}
-                    
-                    # Initialize this user's votes as an object/dict, not an array
-                    if student_name not in updated_data["votes"]:
-                        updated_data["votes"][student_name] = {}
-                    elif isinstance(updated_data["votes"][student_name], list):
-                        # Convert array to object format with prefixed keys
-                        old_votes = updated_data["votes"][student_name]
-                        updated_data["votes"][student_name] = {}
-                        for j, vote in enumerate(old_votes):
-                            if j < len(updated_data["ideas"]):
-                                updated_data["votes"][student_name][f"idea_{j}"] = vote
-                    
-                    # Update the vote in the object
-                    updated_data["votes"][student_name][idea_id] = rating
-                    
-                    # Save the entire updated votes structure
-                    success = False
-                    if firebase_admin._apps:
-                        try:
-                            votes_ref = db.reference(f"/classes/{st.session_state.class_code}/votes/{student_name}")
-                            votes_ref.set(updated_data["votes"][student_name])
-                            success = True
-                        except Exception as e:
-                            st.error(f"Error saving vote: {str(e)}")
-                    else:
-                        vote_response = requests.put(
-                            f"{FIREBASE_URL}/classes/{st.session_state.class_code}/votes/{student_name}.json",
-                            data=json.dumps(updated_data["votes"][student_name])
-                        )
-                        success = vote_response.status_code == 200
-                    
-                    if success:
-                        # Update session state
-                        st.session_state.current_votes[idea_id] = rating
-                        return True
-                    return False
+                # Save vote changes (None removes a vote). Session state is updated
+                # right away and only the changed votes are written, in the background;
+                # failures are reported by check_pending_writes on a later rerun.
+                def save_votes(changes, delay=0):
+                    for idea_id, rating in changes.items():
+                        if rating is None:
+                            st.session_state.current_votes.pop(idea_id, None)
+                        else:
+                            st.session_state.current_votes[idea_id] = rating
+                    queue_update(votes_path, changes, delay=delay)
                 
-                # Display each idea with its own voting controls
-                for i, idea_data in ideas_with_indices:
-                    # Use prefixed idea_id to prevent Firebase from converting to array
-                    idea_id = f"idea_{i}"
+                # Callback for auto-save, debounced so a burst of slider
+                # changes collapses into a single write
+                def on_slider_change(slider_key, idea_key):
+                    new_value = st.session_state[slider_key]
                     
-                    with st.container():
-                        st.divider()
-                        # Display idea without category and submitter's name - handle missing data
-                        if isinstance(idea_data, dict) and 'idea' in idea_data:
-                            st.markdown(f"**Scenario:** {idea_data['idea']}")
-                        else:
-                            # Fallback for malformed data
-                            idea_text = idea_data.get('idea', 'Unknown scenario') if isinstance(idea_data, dict) else 'Unknown scenario'
-                            st.markdown(f"**Scenario:** {idea_text}")
-                        
-                        # Get current vote value - default to 0 (no vote)
-                        current_value = 0
-                        if idea_id in st.session_state.current_votes:
-                            current_value = st.session_state.current_votes[idea_id]
-                        
-                        # Create columns for rating and submit button
-                        col1, col2 = st.columns([3, 1])
-                        
-                        with col1:
-                            # Callback for auto-save
-                            def on_slider_change(key):
-                                if st.session_state.auto_save:
-                                    # Extract idea_id from the key
-                                    slider_key = key
-                                    idx = int(slider_key.split('_')[-1])
-                                    idea_key = f"idea_{idx}"
-                                    new_value = st.session_state[slider_key]
-                                    
-                                    # Only save if value changed and not 0 (no vote)
-                                    if new_value > 0:
-                                        if idea_key not in st.session_state.current_votes or st.session_state.current_votes[idea_key] != new_value:
-                                            success = save_vote(idea_key, new_value)
-                                            if success:
-                                                st.toast(f"Vote automatically saved: {new_value}/5")
-                                    # If value is 0 and there was a previous vote, remove it
-                                    elif idea_key in st.session_state.current_votes:
-                                        # Remove vote from Firebase
-                                        updated_data = get_data()
-                                        if "votes" in updated_data and student_name in updated_data["votes"]:
-                                            if idea_key in updated_data["votes"][student_name]:
-                                                # Create a copy without this vote
-                                                updated_votes = updated_data["votes"][student_name].copy()
-                                                updated_votes.pop(idea_key, None)
-                                                
-                                                # Save the updated votes
-                                                success = False
-                                                if firebase_admin._apps:
-                                                    try:
-                                                        votes_ref = db.reference(f"/classes/{st.session_state.class_code}/votes/{student_name}")
-                                                        votes_ref.set(updated_votes)
-                                                        success = True
-                                                    except Exception as e:
-                                                        st.error(f"Error removing vote: {str(e)}")
-                                                else:
-                                                    vote_response = requests.put(
-                                                        f"{FIREBASE_URL}/classes/{st.session_state.class_code}/votes/{student_name}.json",
-                                                        data=json.dumps(updated_votes)
-                                                    )
-                                                    success = vote_response.status_code == 200
-                                                
-                                                if success:
-                                                    # Update session state
-                                                    st.session_state.current_votes.pop(idea_key, None)
-                                                    st.toast("Vote removed")
-                            
-                            # Slider for rating with 0 as "No Vote"
-                            slider_key = f"vote_slider_{i}"
-                            new_rating = st.select_slider(
-                                f"Your rating:",
-                                options=[0, 1, 2, 3, 4, 5],
-                                value=current_value,
-                                key=slider_key,
-                                on_change=on_slider_change,
-                                args=(slider_key,),
-                                format_func=lambda x: {
-                                    0: "No Vote",
-                                    1: "1 - Clearly Unacceptable",
-                                    2: "2 - Somewhat Unacceptable",
-                                    3: "3 - Neutral/Borderline",
-                                    4: "4 - Somewhat Acceptable",
-                                    5: "5 - Clearly Acceptable"
-                                }.get(x, str(x))
-                            )
-                        
-                        with col2:
-                            # Only show submit button if auto-save is disabled
-                            if not st.session_state.auto_save:
-                                # Only enable button if rating changed and not 0 (no vote)
-                                button_disabled = (new_rating == 0 or 
-                                                  (idea_id in st.session_state.current_votes and 
-                                                   st.session_state.current_votes[idea_id] == new_rating))
-                                
-                                if new_rating > 0:
-                                    if st.button("Submit Vote", key=f"submit_vote_{i}", 
-                                                disabled=button_disabled):
-                                        if save_vote(idea_id, new_rating):
-                                            st.success(f"Vote submitted for this scenario!")
-                                            time.sleep(0.5)
-                                            st.rerun()
-                                        else:
-                                            st.error("Failed to submit vote. Please try again.")
-                                else:
-                                    # Show remove vote button if there's an existing vote
-                                    if idea_id in st.session_state.current_votes:
-                                        if st.button("Remove Vote", key=f"remove_vote_{i}"):
-                                            # Remove vote from Firebase
-                                            updated_data = get_data()
-                                            if "votes" in updated_data and student_name in updated_data["votes"]:
-                                                if idea_id in updated_data["votes"][student_name]:
-                                                    # Create a copy without this vote
-                                                    updated_votes = updated_data["votes"][student_name].copy()
-                                                    updated_votes.pop(idea_id, None)
-                                                    
-                                                    # Save the updated votes
-                                                    success = False
-                                                    if firebase_admin._apps:
-                                                        try:
-                                                            votes_ref = db.reference(f"/classes/{st.session_state.class_code}/votes/{student_name}")
-                                                            votes_ref.set(updated_votes)
-                                                            success = True
-                                                        except Exception as e:
-                                                            st.error(f"Error removing vote: {str(e)}")
-                                                    else:
-                                                        vote_response = requests.put(
-                                                            f"{FIREBASE_URL}/classes/{st.session_state.class_code}/votes/{student_name}.json",
-                                                            data=json.dumps(updated_votes)
-                                                        )
-                                                        success = vote_response.status_code == 200
-                                                    
-                                                    if success:
-                                                        # Update session state
-                                                        st.session_state.current_votes.pop(idea_id, None)
-                                                        st.success("Vote removed!")
-                                                        time.sleep(0.5)
-                                                        st.rerun()
-                                                    else:
-                                                        st.error("Failed to remove vote. Please try again.")
-                                    else:
-                                        # Placeholder button that's disabled
-                                        st.button("Submit Vote", key=f"submit_vote_{i}", disabled=True)
+                    # Only save if value changed and not 0 (no vote)
+                    if new_value > 0:
+                        if idea_key not in st.session_state.current_votes or st.session_state.current_votes[idea_key] != new_value:
+                            save_votes({idea_key: new_value}, delay=AUTO_SAVE_DEBOUNCE)
+                            st.toast(f"Saving your vote: {new_value}/5")
+                    # If value is 0 and there was a previous vote, remove it
+                    elif idea_key in st.session_state.current_votes:
+                        save_votes({idea_key: None}, delay=AUTO_SAVE_DEBOUNCE)
+                        st.toast("Removing your vote")
+                
+                # Without auto-save, all sliders sit in one form and are saved together.
+                # Widgets inside a form can't have change callbacks, so auto-save
+                # renders them in a plain container instead.
+                if st.session_state.auto_save:
+                    votes_container = st.container()
+                else:
+                    st.caption("Move the sliders, then press **Save all votes** at the bottom. Set a slider to \"No Vote\" to remove a vote.")
+                    votes_container = st.form("votes")
+                
+                with votes_container:
+                    form_ratings = {}
+                    for idea_id in idea_order:
+                        # Display idea without category and submitter's name
+                        idea_text, _ = ideas[idea_id]
+                        st.markdown(f"---\n**Scenario:** {idea_text}")
                         
-                        # Show current vote if already voted
-                        if idea_id in st.session_state.current_votes:
-                            st.info(f"Your current rating: {st.session_state.current_votes[idea_id]}/5")
+                        # Slider for rating with 0 as "No Vote", defaulting to the current vote
+                        slider_key = f"vote_slider_{idea_id}"
+                        slider_callback = {}
+                        if st.session_state.auto_save:
+                            slider_callback = {"on_change": on_slider_change, "args": (slider_key, idea_id)}
+                        form_ratings[idea_id] = st.select_slider(
+                            f"Your rating:",
+                            options=list(RATING_LABELS),
+                            value=st.session_state.current_votes.get(idea_id, 0),
+                            key=slider_key,
+                            format_func=RATING_LABELS.get,
+                            **slider_callback
+                        )
+                    
+                    if not st.session_state.auto_save and st.form_submit_button("Save all votes"):
+                        # Only write the votes that differ from what's saved
+                        changes = {
+                            idea_id: rating or None
+                            for idea_id, rating in form_ratings.items()
+                            if rating != st.session_state.current_votes.get(idea_id, 0)
+                        }
+                        if not changes:
+                            st.info("No vote changes to save.")
                         else:
-                            st.info("No vote submitted yet")
+                            save_votes(changes)
+                            st.info(f"Saving {len(changes)} vote change(s)...")
                 
                 # Add a button to clear all votes
                 st.divider()
                 if st.button("Clear All My Votes"):
-                    # Delete just this user's votes using a direct path
-                    success = False
-                    if firebase_admin._apps:
-                        try:
-                            votes_ref = db.reference(f"/classes/{st.session_state.class_code}/votes/{student_name}")
-                            votes_ref.delete()
-                            success = True
-                        except Exception as e:
-                            st.error(f"Error clearing votes: {str(e)}")
-                    else:
-                        vote_path = f"votes/{student_name}"
-                        vote_response = requests.delete(
-                            f"{FIREBASE_URL}/classes/{st.session_state.class_code}/{vote_path}.json"
-                        )
-                        success = vote_response.status_code == 200
+                    # Delete just this user's votes using a direct path. Queuing it
+                    # also supersedes any of their vote writes still in flight.
+                    queue_write(votes_path, None)
                     
-                    if success:
-                        # Clear session state
-                        st.session_state.current_votes = {}
-                        st.session_state.pop("randomized_ideas", None)
-                        st.success("All your votes have been cleared!")
-                        time.sleep(0.5)
-                        st.rerun()
-                    else:
-                        st.error("Failed to clear votes. Please try again.")
+                    # Clear session state, including the sliders' remembered values
+                    st.session_state.current_votes = {}
+                    st.session_state.pop("randomized_ideas", None)
+                    for slider_key in [key for key in st.session_state if str(key).startswith("vote_slider_")]:
+                        del st.session_state[slider_key]
+                    # A toast survives the rerun, so there's no need to pause on the message
+                    st.toast("All your votes have been cleared!")
+                    st.rerun()
             else:
                 st.info("No scenarios have been submitted yet!")
     
@@ -607,66 +1029,14 @@ def main():
         Higher scores indicate stronger agreement with the scenario's ethical categorization.
         """)
         
-        # Refresh data for latest results
-        data = get_data()
+        # Students with at least one saved vote. At the start of class there are
+        # usually none, and the results don't need to be built at all
+        voters = [voter for voter, votes in data["votes"].items() if isinstance(votes, dict) and votes]
         
-        if data.get("ideas"):
-            # Import pandas for results processing
-            import pandas as pd
-            import numpy as np  # Add numpy for handling NaN values
-            
-            # Calculate average scores for each scenario
-            results = []
-            for i, idea_data in enumerate(data["ideas"]):
-                # Use prefixed idea_id to match the new format
-                idea_id = f"idea_{i}"
-                
-                # Extract idea details with fallbacks for missing data
-                if isinstance(idea_data, dict):
-                    idea_text = idea_data.get('idea', 'Unknown scenario')
-                    submitted_by = idea_data.get('submitted_by', 'Unknown')
-                else:
-                    idea_text = 'Unknown scenario'
-                    submitted_by = 'Unknown'
-                
-                # Collect all votes for this scenario
-                votes = []
-                if "votes" in data:
-                    for voter, voter_votes in data["votes"].items():
-                        # Check if voter_votes is a dictionary and contains this idea_id
-                        if isinstance(voter_votes, dict) and idea_id in voter_votes:
-                            try:
-                                votes.append(int(voter_votes[idea_id]))
-                            except (ValueError, TypeError):
-                                # Skip invalid votes
-                                pass
-                        # Handle legacy array format
-                        elif isinstance(voter_votes, list) and i < len(voter_votes):
-                            try:
-                                votes.append(int(voter_votes[i]))
-                            except (ValueError, TypeError):
-                                # Skip invalid votes
-                                pass
-                
-                # Fix: Handle case when there are no votes
-                avg_score = sum(votes) / len(votes) if votes else 0
-                num_votes = len(votes)
-                
-                results.append({
-                    "idea_num": i + 1,
-                    "idea": idea_text,
-                    "submitted_by": submitted_by,
-                    "avg_score": avg_score,
-                    "num_votes": num_votes
-                })
-            
-            # Create results DataFrame and sort by average score
-            results_df = pd.DataFrame(results)
-            
-            # Fix: Check if DataFrame is empty or if all avg_scores are 0
-            if not results_df.empty and results_df['avg_score'].sum() > 0:
-                # Sort by average score, handling NaN values
-                results_df = results_df.sort_values("avg_score", ascending=False)
+        if data.get("ideas") and voters:
+            results = cached_results(ideas, data["votes"])
+            if results:
+                results_df, chart_data = results
                 
                 # Display results as a table
                 st.dataframe(
@@ -678,30 +1048,23 @@ def main():
                         "avg_score": st.column_config.NumberColumn("Ethical Score", format="%.2f/5"),
                         "num_votes": "Number of Votes"
                     },
-                    hide_index=True
+                    hide_index=True,
+                    use_container_width=True
                 )
                 
                 # Create a bar chart of results
                 st.subheader("Average Scores (Higher is Better)")
-                chart_data = results_df.copy()
-                chart_data["idea_label"] = chart_data.apply(lambda x: f"Scenario {x['idea_num']}", axis=1)
-                
-                # Fix: Ensure we have valid data for the chart
-                if not chart_data.empty and chart_data['avg_score'].sum() > 0:
-                    st.bar_chart(data=chart_data, x="idea_label", y="avg_score", height=400)
-                else:
-                    st.info("No votes have been submitted yet for the chart visualization.")
+                st.bar_chart(data=chart_data, x="idea_label", y="avg_score", height=400)
                 
                 # Show who has voted
-                if "votes" in data:
-                    st.subheader("Participation")
-                    voters_count = sum(1 for voter, votes in data["votes"].items() if isinstance(votes, dict) and votes)
-                    st.write(f"Total number of voters: {voters_count}")
-                    st.write("Students who have voted:")
-                    voters = [voter for voter, votes in data["votes"].items() if isinstance(votes, dict) and votes]
-                    st.write(", ".join(voters) if voters else "No one has voted yet")
+                st.subheader("Participation")
+                st.write(f"Total number of voters: {len(voters)}")
+                with st.expander(f"Show the {len(voters)} students who have voted"):
+                    st.write(", ".join(voters))
             else:
                 st.info("No votes have been submitted yet!")
+        elif data.get("ideas"):
+            st.info("No votes have been submitted yet!")
         else:
             st.info("No scenarios have been submitted yet!")
 